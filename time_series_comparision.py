@@ -1,9 +1,45 @@
 import os
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import matplotlib
+matplotlib.use('Agg')  # Render to files only, no GUI backend
 import matplotlib.pyplot as plt 
 from sqlalchemy import create_engine
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
+
+try:
+    import simsimd
+except ImportError:  # Optional SIMD kernels, fall back to NumPy
+    simsimd = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Optional JIT kernel, fall back to SimSIMD/NumPy
+    njit = None
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'  # Rust-based reader, much faster than openpyxl
+except ImportError:
+    EXCEL_ENGINE = None  # pandas default (openpyxl)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_batch(matrix, vector, out):
+        # Fused dot product and row norm, one table per parallel iteration;
+        # vector is unit length, so only the row norm is needed
+        for i in prange(matrix.shape[0]):
+            dot = 0.0
+            norm2 = 0.0
+            for k in range(matrix.shape[1]):
+                dot += matrix[i, k] * vector[k]
+                norm2 += matrix[i, k] * matrix[i, k]
+            out[i] = dot / np.sqrt(norm2) if norm2 > 0 else 0.0
 
 def process_input_file(file_path, output_dir, date_column='Week Ending Date', value_column='Detections'):
     """
@@ -16,13 +52,14 @@ def process_input_file(file_path, output_dir, date_column='Week Ending Date', va
         value_column (str): Name of the value column to normalize
         
     Returns:
-        tuple: (pd.DataFrame, str) - Normalized input data and the value column name
+        tuple: (np.ndarray, np.ndarray) - Input dates (datetime64[ns]) and
+            normalized values
     """
     print(f"Processing input file: {file_path}")
     
     # Read input file based on extension
     if file_path.endswith(('.xlsx', '.xls')):
-        data = pd.read_excel(file_path)
+        data = pd.read_excel(file_path, engine=EXCEL_ENGINE)
     else:
         data = pd.read_csv(file_path)
     
@@ -32,199 +69,477 @@ def process_input_file(file_path, output_dir, date_column='Week Ending Date', va
     if value_column not in data.columns:
         raise ValueError(f"Value column '{value_column}' not found in input file")
     
-    # Process dates and set index
-    data[date_column] = pd.to_datetime(data[date_column])
-    data.set_index(date_column, inplace=True)
-    
-    # Normalize data
-    scaler = StandardScaler()
-    normalized_data = pd.DataFrame(
-        scaler.fit_transform(data[[value_column]]),
-        columns=[value_column],
-        index=data.index
-    )
+    # Process dates
+    dates = pd.to_datetime(data[date_column]).to_numpy(dtype='datetime64[ns]')
+    if not pd.Index(dates).is_unique:
+        raise ValueError(f"Date column '{date_column}' contains duplicate dates in input file")
+
+    # Normalize data (population z-score). Like StandardScaler, a standard
+    # deviation within rounding error of zero marks a constant series,
+    # which is only centered
+    values = data[value_column].to_numpy(dtype=np.float64)
+    mean = np.nanmean(values)
+    std = np.nanstd(values)
+    if std < 10 * np.finfo(np.float64).eps * max(1.0, abs(mean)):
+        std = 1.0
+    values = (values - mean) / std
     
     # Save normalized data
     output_path = os.path.join(output_dir, 'normalized_input.csv')
-    normalized_data.to_csv(output_path)
+    pd.DataFrame(
+        {value_column: values},
+        index=pd.DatetimeIndex(dates, name=date_column)
+    ).to_csv(output_path)
     print(f"Normalized input saved to: {output_path}")
     
-    return normalized_data, value_column
+    # Save unit-length vector alongside for reuse in similarity scoring;
+    # missing values count as 0, like dates missing from a table
+    unit_vector = unit_normalize(np.nan_to_num(values.astype(np.float32)))
+    np.save(os.path.join(output_dir, 'normalized_input.npy'), unit_vector)
+    
+    return dates, values
+
+def read_normalized_table(path, date_column, value_column):
+    """
+    Read a normalized table saved as Parquet.
+    
+    Parameters:
+        path (str): Path of the normalized Parquet file
+        date_column (str): Name of the date column in the file
+        value_column (str): Name of the value column in the file
+        
+    Returns:
+        tuple: (np.ndarray, np.ndarray) - Dates (datetime64[ns]) and normalized values
+    """
+    table = pq.read_table(path, columns=[date_column, value_column])
+    return (
+        table.column(date_column).to_numpy().astype('datetime64[ns]'),
+        table.column(value_column).to_numpy()
+    )
+
+def load_cached_table(path, fingerprint, date_column, value_column):
+    """
+    Load a normalized table written by an earlier run if it is still current.
+    
+    Parameters:
+        path (str): Path of the normalized Parquet file
+        fingerprint (bytes): Fingerprint of the table's current contents
+        date_column (str): Name of the date column in the file
+        value_column (str): Name of the value column in the file
+        
+    Returns:
+        tuple: (np.ndarray, np.ndarray) - Cached dates (datetime64[ns]) and
+            normalized values, or None if missing, stale or unreadable
+    """
+    if not os.path.exists(path):
+        return None
+    
+    # A corrupt or truncated file is a cache miss; the fresh write replaces it
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        if metadata.get(b'fingerprint') != fingerprint:
+            return None
+        return read_normalized_table(path, date_column, value_column)
+    except (pa.ArrowInvalid, OSError):
+        return None
 
-def process_database_table(engine, table_name, output_dir, db_date_column='Date', db_value_column='Value'):
+def process_database_table(conn, table_name, output_dir, input_dates, 
+                           db_date_column='Date', db_value_column='Value'):
     """
     Process and normalize a single database table.
     
     Parameters:
-        engine: SQLAlchemy engine
+        conn: SQLAlchemy connection
         table_name (str): Name of the table to process
         output_dir (str): Output directory for normalized data
+        input_dates (pd.DatetimeIndex): Dates of the input series to align to
         db_date_column (str): Name of the date column in database
         db_value_column (str): Name of the value column in database
         
     Returns:
-        tuple: (table_name, normalized_data) or None if error
+        tuple: (table_name, aligned_values) or None if error, where
+            aligned_values holds the normalized series on input_dates (0 where
+            the table has no data)
     """
     try:
-        # Read table data
-        query = f'SELECT * FROM "{table_name}"'
-        data = pd.read_sql(query, engine, parse_dates=[db_date_column])
+        # Read column names only to validate the table layout
+        columns = pd.read_sql(f'SELECT * FROM "{table_name}" LIMIT 0', conn).columns
         
         # Validate columns exist
-        if db_date_column not in data.columns:
+        if db_date_column not in columns:
             print(f"Date column '{db_date_column}' not found in table {table_name}")
             return None
-        if db_value_column not in data.columns:
+        if db_value_column not in columns:
             print(f"Value column '{db_value_column}' not found in table {table_name}")
             return None
-            
-        data.set_index(db_date_column, inplace=True)
-        
-        # Normalize table data
-        scaler = StandardScaler()
-        normalized_data = pd.DataFrame(
-            scaler.fit_transform(data[[db_value_column]]),
-            columns=[db_value_column],
-            index=data.index
-        )
         
-        # Save normalized table
-        output_path = os.path.join(output_dir, f'{table_name}_normalized.csv')
-        normalized_data.to_csv(output_path)
+        # Compute the z-score statistics in one scan, together with an
+        # order-independent checksum of the table contents (a sum of per-row
+        # hashes, so no sort and constant memory) used as the cache fingerprint
+        value_sql = f'CAST("{db_value_column}" AS double precision)'
+        stats_sql = f'avg({value_sql}) AS mean, stddev_pop({value_sql}) AS std'
+        try:
+            stats = pd.read_sql(f'''
+                SELECT {stats_sql},
+                       count(*) AS rows,
+                       sum(hashtextextended(
+                           COALESCE(CAST("{db_date_column}" AS text), '') || ':' ||
+                           COALESCE(CAST("{db_value_column}" AS text), ''),
+                           0
+                       )) AS checksum
+                FROM "{table_name}"
+            ''', conn).iloc[0]
+        except Exception:
+            # Without a checksum the table is simply not cached
+            conn.rollback()
+            stats = pd.read_sql(f'SELECT {stats_sql} FROM "{table_name}"', conn).iloc[0]
+        
+        # Like StandardScaler, a stddev within rounding error of zero marks a
+        # constant series, which is only centered
+        mean = 0.0 if pd.isna(stats['mean']) else float(stats['mean'])
+        std = 0.0 if pd.isna(stats['std']) else float(stats['std'])
+        if std < 10 * np.finfo(np.float64).eps * max(1.0, abs(mean)):
+            std = 1.0
+        
+        # Normalize table data server-side so only the date and normalized
+        # value columns are transferred
+        query = f'''
+            SELECT "{db_date_column}",
+                   ({value_sql} - CAST({mean!r} AS double precision))
+                       / CAST({std!r} AS double precision) AS "{db_value_column}"
+            FROM "{table_name}"
+        '''
+        
+        # The fingerprint covers the query too, so changes to the normalization
+        # invalidate old files; a Parquet file from an earlier run with the same
+        # fingerprint is reused as-is
+        fingerprint = None
+        if 'checksum' in stats:
+            fingerprint = hashlib.blake2b(
+                repr((table_name, query, int(stats['rows']), str(stats['checksum']))).encode(),
+                digest_size=8
+            ).hexdigest().encode()
+        
+        output_path = os.path.join(output_dir, f'{table_name}_normalized.parquet')
+        cached = None
+        if fingerprint is not None:
+            cached = load_cached_table(output_path, fingerprint, db_date_column, db_value_column)
+        
+        # Align to the input dates as the data arrives so scoring can use plain
+        # arrays; dates the table lacks, or has without a value, count as 0
+        aligned_values = np.zeros(len(input_dates), dtype=np.float32)
+        
+        def align(dates, values):
+            positions = input_dates.get_indexer(dates)
+            matched = positions >= 0
+            aligned_values[positions[matched]] = values[matched]
         
-        return (table_name, normalized_data)
+        if cached is not None:
+            align(*cached)
+        else:
+            # Stream the result in chunks, appending each to the Parquet file;
+            # write to a temporary path so a failed run never leaves a file
+            # that looks like a valid cache entry
+            temp_path = f'{output_path}.tmp'
+            writer = None
+            try:
+                for chunk in pd.read_sql(query, conn, parse_dates=[db_date_column], chunksize=100_000):
+                    chunk_dates = chunk[db_date_column].to_numpy(dtype='datetime64[ns]')
+                    chunk_values = chunk[db_value_column].to_numpy(dtype=np.float64)
+                    
+                    # Save normalized table
+                    arrow_chunk = pa.table({db_date_column: chunk_dates, db_value_column: chunk_values})
+                    if writer is None:
+                        writer = pq.ParquetWriter(temp_path, arrow_chunk.schema.with_metadata(
+                            {b'fingerprint': fingerprint} if fingerprint is not None else None
+                        ))
+                    writer.write_table(arrow_chunk)
+                    
+                    align(chunk_dates, chunk_values)
+            except Exception:
+                # Don't leave a partial file behind in the output directory
+                if writer is not None:
+                    writer.close()
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            if writer is not None:
+                writer.close()
+                os.replace(temp_path, output_path)
+        
+        np.nan_to_num(aligned_values, copy=False)
+        
+        return (table_name, aligned_values)
         
     except Exception as e:
         print(f"Error processing table {table_name}: {e}")
+        # Reset the failed transaction so the connection can be reused
+        conn.rollback()
         return None
 
-def calculate_similarity(input_series, table_series):
+def unit_normalize(vector):
+    """
+    Scale a vector, or each row of a matrix, to unit L2 norm.
+    
+    Parameters:
+        vector (np.ndarray): Vector of shape (N,) or matrix of shape (T, N)
+        
+    Returns:
+        np.ndarray: Unit-length vector or rows; zero-norm rows are left unchanged
+    """
+    norm = np.linalg.norm(vector, axis=-1, keepdims=True)
+    return vector / np.where(norm == 0, 1, norm)
+
+def calculate_similarities(input_vector, table_matrix):
     """
-    Calculate cosine similarity between two series.
+    Calculate cosine similarity between the input series and every table at once.
     
     Parameters:
-        input_series: Input data series
-        table_series: Table data series
+        input_vector (np.ndarray): Unit-length input series of shape (N,)
+        table_matrix (np.ndarray): Table series stacked into shape (T, N)
         
     Returns:
-        float: Similarity score
+        np.ndarray: Similarity score for each of the T tables
     """
-    return cosine_similarity(
-        input_series.values.reshape(1, -1),
-        table_series.values.reshape(1, -1)
-    )[0][0]
+    # Use the Numba kernel when installed; it computes row norms in the same pass.
+    # It is compiled (or loaded from Numba's cache) on the first call, so
+    # processes that never score, like the plot workers, don't pay for it
+    if njit is not None:
+        scores = np.empty(len(table_matrix))
+        _cosine_batch(table_matrix, input_vector, scores)
+        return scores
+    
+    # Otherwise scale rows to unit length so cosine reduces to a dot product
+    table_matrix = unit_normalize(table_matrix)
+    
+    # Use SimSIMD's dot-product kernel when installed
+    if simsimd is not None:
+        scores = simsimd.cdist(table_matrix, input_vector.reshape(1, -1), metric='dot')
+        return np.asarray(scores).ravel()
+    
+    return table_matrix @ input_vector
 
-def process_database(db_url, input_data, value_column, output_dir, 
-                    db_date_column='Date', db_value_column='Value'):
+def process_database(db_url, input_dates, input_values, output_dir, 
+                    db_date_column='Date', db_value_column='Value', num_plots=5):
     """
     Process database tables and calculate similarities.
     
     Parameters:
         db_url (str): Database connection URL
-        input_data (pd.DataFrame): Normalized input data
-        value_column (str): Name of the value column from input data
+        input_dates (np.ndarray): Input dates (datetime64[ns])
+        input_values (np.ndarray): Normalized input values
         output_dir (str): Output directory for results
         db_date_column (str): Name of the date column in database
         db_value_column (str): Name of the value column in database
+        num_plots (int): Number of top similar tables to return
         
     Returns:
-        pd.DataFrame: Similarity results
+        tuple: (pd.DataFrame, dict) - Top similarity results sorted by score and
+            the normalized (dates, values) of those tables keyed by table name
     """
     print("\nProcessing database tables...")
     engine = create_engine(db_url)
+    input_index = pd.DatetimeIndex(input_dates)
     
     # Get list of tables
-    tables = pd.read_sql_query(
-        "SELECT tablename FROM pg_catalog.pg_tables WHERE schemaname='public'",
-        engine
-    )
+    with engine.connect() as conn:
+        tables = pd.read_sql_query(
+            "SELECT tablename FROM pg_catalog.pg_tables WHERE schemaname='public'",
+            conn
+        )
+    
+    # Process tables concurrently; each worker thread opens one streaming
+    # connection and reuses it for every table it handles
+    thread_state = threading.local()
+    connections = []
     
-    # Process each table and calculate similarities
-    similarities = []
-    for table_name in tables['tablename']:
-        result = process_database_table(
-            engine, table_name, output_dir, 
+    def process_table(table_name):
+        if not hasattr(thread_state, 'conn'):
+            thread_state.conn = engine.connect().execution_options(stream_results=True)
+            connections.append(thread_state.conn)
+        return process_database_table(
+            thread_state.conn, table_name, output_dir, input_index,
             db_date_column, db_value_column
         )
+    
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            processed = [
+                result for result in executor.map(process_table, tables['tablename'])
+                if result
+            ]
+    finally:
+        for conn in connections:
+            conn.close()
+    
+    # Score every aligned table in one batch
+    table_names = [table_name for table_name, _ in processed]
+    scores = np.empty(0)
+    if processed:
+        # Missing input values count as 0, like gaps in the tables
+        input_vector = unit_normalize(np.nan_to_num(input_values.astype(np.float32)))
+        table_matrix = np.vstack([aligned_values for _, aligned_values in processed])
+        scores = calculate_similarities(input_vector, table_matrix)
         
-        if result:
-            table_name, normalized_data = result
-            similarity = calculate_similarity(
-                input_data[value_column],
-                normalized_data[db_value_column]
-            )
-            
-            similarities.append({
-                'Table': table_name,
-                'Similarity': similarity
-            })
+        for table_name, similarity in zip(table_names, scores):
             print(f"Processed {table_name}: Similarity = {similarity:.4f}")
     
-    # Create and save results DataFrame
-    results_df = pd.DataFrame(similarities)
-    results_df = results_df.sort_values('Similarity', ascending=False)
-    results_df.to_csv(os.path.join(output_dir, 'similarity_results.csv'), 
-                     index=False)
+    # Save every score, sorted from most to least similar
+    order = np.argsort(-scores, kind='stable')
+    pd.DataFrame({
+        'Table': [table_names[i] for i in order],
+        'Similarity': scores[order]
+    }).to_csv(os.path.join(output_dir, 'similarity_results.csv'), index=False)
+    
+    # Select the top matches in O(T) and sort only those
+    top_count = min(num_plots, len(scores))
+    if 0 < top_count < len(scores):
+        top_indices = np.argpartition(-scores, top_count - 1)[:top_count]
+    else:
+        top_indices = np.arange(top_count)
+    top_indices = top_indices[np.argsort(-scores[top_indices], kind='stable')]
+    
+    results_df = pd.DataFrame({
+        'Table': [table_names[i] for i in top_indices],
+        'Similarity': scores[top_indices].astype(float)
+    })
+    
+    # Read back only the top tables' normalized series for plotting; a table
+    # whose file can't be read just goes without a plot
+    normalized_tables = {}
+    for i in top_indices:
+        try:
+            normalized_tables[table_names[i]] = read_normalized_table(
+                os.path.join(output_dir, f'{table_names[i]}_normalized.parquet'),
+                db_date_column, db_value_column
+            )
+        except Exception as e:
+            print(f"Error reading normalized data for {table_names[i]}: {e}")
     
-    return results_df
+    return results_df, normalized_tables
+
 
 
+# Minimum number of plots per worker before rendering in parallel
+PLOTS_PER_WORKER = 8
+
+def _render_plot(fig, args):
+    """
+    Render and save one comparison plot.
+    
+    Parameters:
+        fig (matplotlib.figure.Figure): Figure to draw the plot on
+        args (tuple): (table_name, similarity, table_values, table_dates,
+            input_values, input_dates, out_path), with dates given as
+            int64 nanoseconds since the epoch
+        
+    Returns:
+        tuple: (table_name, error message or None)
+    """
+    table_name, similarity, table_values, table_dates, input_values, input_dates, out_path = args
+    
+    try:
+        # Clear the previous plot
+        fig.clear()
+        ax = fig.add_subplot()
+        
+        # Plot both series
+        ax.plot(pd.to_datetime(table_dates, unit='ns'), table_values, 
+                label=f"Table: {table_name}", linewidth=2)
+        ax.plot(pd.to_datetime(input_dates, unit='ns'), input_values, 
+                label="Input Data", linestyle="--", linewidth=2)
+        
+        # Customize the plot
+        ax.set_title(f"Time Series Comparison: {table_name}\nCosine Similarity: {similarity:.4f}", 
+                     fontsize=14, pad=20)
+        ax.set_xlabel("Date", fontsize=12)
+        ax.set_ylabel("Normalized Value", fontsize=12)
+        ax.legend(fontsize=10)
+        ax.grid(True, alpha=0.3)
+        
+        # Rotate x-axis labels for better readability
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()
+        
+        # Save the plot
+        fig.savefig(out_path, bbox_inches='tight', dpi=150)
+        return table_name, None
+        
+    except Exception as e:
+        return table_name, str(e)
+
+def _render_plots(payloads):
+    """
+    Render a batch of comparison plots on one reused figure.
+    
+    Parameters:
+        payloads (list): Arguments for _render_plot, one tuple per plot
+        
+    Returns:
+        list: (table_name, error message or None) for each plot
+    """
+    fig = plt.figure(figsize=(12, 6))
+    try:
+        return [_render_plot(fig, args) for args in payloads]
+    finally:
+        plt.close(fig)
 
-def visualize_results(similarity_results, normalized_input, input_value_column, 
-                     normalized_dir, num_plots=5):
+def visualize_results(similarity_results, normalized_tables, input_dates, 
+                     input_values, output_dir, num_plots=5):
     """
     Create visualization plots comparing top similar tables with input data.
     
     Parameters:
-        similarity_results (pd.DataFrame): DataFrame with similarity scores
-        normalized_input (pd.DataFrame): Normalized input data
-        input_value_column (str): Name of the value column in input data
-        normalized_dir (str): Directory containing normalized table files
+        similarity_results (pd.DataFrame): Top similarity scores, sorted descending
+        normalized_tables (dict): Normalized (dates, values) of each table keyed by
+            table name; tables missing from it are not plotted
+        input_dates (np.ndarray): Input dates (datetime64[ns])
+        input_values (np.ndarray): Normalized input values
+        output_dir (str): Directory to save the plots in
         num_plots (int): Number of top tables to plot
     """
     # Get top N similar tables
-    top_tables = similarity_results.nlargest(num_plots, "Similarity")
+    top_tables = similarity_results.head(num_plots)
+    if top_tables.empty:
+        return
     
-    # Create plots for each top table
-    for _, row in top_tables.iterrows():
-        table_name = row["Table"]
-        similarity = row["Similarity"]
-        
-        try:
-            # Load the normalized table data
-            table_path = os.path.join(normalized_dir, f"{table_name}_normalized.csv")
-            normalized_table = pd.read_csv(table_path, index_col="Date", parse_dates=True)
-            
-            # Create the plot
-            plt.figure(figsize=(12, 6))
-            
-            # Plot both series
-            plt.plot(normalized_table.index, normalized_table["Value"], 
-                    label=f"Table: {table_name}", linewidth=2)
-            plt.plot(normalized_input.index, normalized_input[input_value_column], 
-                    label="Input Data", linestyle="--", linewidth=2)
-            
-            # Customize the plot
-            plt.title(f"Time Series Comparison: {table_name}\nCosine Similarity: {similarity:.4f}", 
-                     fontsize=14, pad=20)
-            plt.xlabel("Date", fontsize=12)
-            plt.ylabel("Normalized Value", fontsize=12)
-            plt.legend(fontsize=10)
-            plt.grid(True, alpha=0.3)
-            
-            # Rotate x-axis labels for better readability
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Save the plot
-            plot_path = os.path.join(normalized_dir, f"comparison_{table_name}.png")
-            plt.savefig(plot_path, bbox_inches='tight', dpi=300)
-            plt.close()
-            
+    # Build picklable payloads so each plot can render in its own process;
+    # dates travel as int64 epoch nanoseconds, never as datetime objects
+    payloads = [
+        (
+            row["Table"], row["Similarity"],
+            normalized_tables[row["Table"]][1],
+            normalized_tables[row["Table"]][0].view(np.int64),
+            input_values, input_dates.view(np.int64),
+            os.path.join(output_dir, f"comparison_{row['Table']}.png")
+        )
+        for _, row in top_tables.iterrows()
+        if row["Table"] in normalized_tables
+    ]
+    
+    # A spawned worker spends about as long re-importing this module as it
+    # takes to render several plots, so only use processes when each one
+    # gets enough plots to pay that back; spawn avoids forking a process
+    # that has live database and JIT worker threads
+    max_workers = min(len(payloads) // PLOTS_PER_WORKER, os.cpu_count() or 1)
+    if max_workers > 1:
+        # One contiguous batch per worker, each rendered on its own figure
+        batches = [
+            payloads[i * len(payloads) // max_workers:(i + 1) * len(payloads) // max_workers]
+            for i in range(max_workers)
+        ]
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = [result for batch in executor.map(_render_plots, batches)
+                       for result in batch]
+    else:
+        results = _render_plots(payloads)
+    
+    for table_name, error in results:
+        if error:
+            print(f"Error creating plot for {table_name}: {error}")
+        else:
             print(f"Created comparison plot for {table_name}")
-            
-        except Exception as e:
-            print(f"Error creating plot for {table_name}: {e}")
 
 def run_analysis(input_file, db_url, output_dir="output_data", 
                 input_date_column='Week Ending Date', 
@@ -250,25 +565,25 @@ def run_analysis(input_file, db_url, output_dir="output_data",
         os.makedirs(output_dir, exist_ok=True)
         
         # Process input file
-        input_data, value_column = process_input_file(
+        input_dates, input_values = process_input_file(
             input_file, output_dir, 
             input_date_column, input_value_column
         )
         
         # Process database and get results
-        results = process_database(
-            db_url, input_data, value_column, output_dir,
-            db_date_column, db_value_column
+        results, normalized_tables = process_database(
+            db_url, input_dates, input_values, output_dir,
+            db_date_column, db_value_column, num_plots
         )
         
         # Display top results
         print(f"\nTop {num_plots} most similar tables:")
-        print(results.head(num_plots))
+        print(results)
         
         # Create visualization plots
         print("\nGenerating comparison plots...")
         visualize_results(
-            results, input_data, value_column, 
+            results, normalized_tables, input_dates, input_values, 
             output_dir, num_plots
         )
         print(f"\nPlots have been saved in: {output_dir}")